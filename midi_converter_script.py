@@ -4,11 +4,144 @@ MIDI Converter for Alternative Rock Track Structure
 Converts the musical notation into a playable MIDI file
 """
 
+from array import array
+from collections import namedtuple
+import logging
+from itertools import cycle, islice
 import mido
 from mido import MidiFile, MidiTrack, Message
+from mido.midifiles.tracks import fix_end_of_track
 import math
+from operator import itemgetter
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Note mapping (MIDI note numbers, octave 4)
+NOTES = {
+    'C': 60, 'C#': 61, 'Db': 61, 'D': 62, 'D#': 63, 'Eb': 63,
+    'E': 64, 'F': 65, 'F#': 66, 'Gb': 66, 'G': 67, 'G#': 68,
+    'Ab': 68, 'A': 69, 'A#': 70, 'Bb': 70, 'B': 71
+}
+
+def _build_note_table():
+    """Map every note name (e.g. 'D5', 'Bb1', 'F') to its MIDI number"""
+    table = {}
+    for name, base_note in NOTES.items():
+        # No octave specified, default to 4
+        table[name] = base_note
+        for octave in range(10):
+            # Adjust for octave (octave 4 = middle C area)
+            midi_note = base_note + (octave - 4) * 12
+            
+            # Clamp to valid MIDI range; only octave 9 can exceed it
+            table[f"{name}{octave}"] = 127 if midi_note > 127 else midi_note
+    return table
+
+NOTE_NAME_TO_MIDI = _build_note_table()
+
+# Single-byte variable-length quantities for delta times below 128 ticks
+_VLQ_SMALL = [bytes([value]) for value in range(128)]
+
+def _encode_vlq(value):
+    """Encode a delta time as a MIDI variable-length quantity"""
+    if value < 128:
+        return _VLQ_SMALL[value]
+    encoded = [value & 0x7F]
+    value >>= 7
+    while value:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(encoded))
+
+def _emit_note_events(note_ids, durations, velocity, time_offset=0):
+    """Build (abs_tick, note, velocity, type) events for a monophonic line.
+
+    The line starts at time_offset; a note id of None is a rest.
+    """
+    events = [None] * (2 * sum(note is not None for note in note_ids))
+    tick = time_offset
+    pos = 0
+    
+    for note, duration in zip(note_ids, durations):
+        if note is not None:
+            events[pos] = (tick, note, velocity, 'note_on')
+            events[pos + 1] = (tick + duration, note, 0, 'note_off')
+            pos += 2
+        tick += duration
+        
+    return events
+
+# Contents of one song section; sequences are tuples so sections can share them
+SectionData = namedtuple('SectionData', 'chords melody bass velocity rhythm')
 
 class MidiConverter:
+    # Sections that recur with only a different velocity share one base
+    _VERSE_BASE = SectionData(
+        chords=('Dm', 'Bb', 'F', 'C', 'Dm', 'Bb', 'F', 'A7') * 2,
+        melody=('D4', 'F4', 'G4', 'F4', 'D4', 'C4', 'D4', 'D4',
+                'F4', 'G4', 'A4', 'G4', 'F4', 'D4', 'F4', 'F4'),
+        bass=('D2', 'Bb1', 'F1', 'C2', 'D2', 'Bb1', 'F1', 'A1') * 2,
+        velocity=None,
+        rhythm=(1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, 2.0)
+    )
+    
+    _PRE_CHORUS_BASE = SectionData(
+        chords=('Bb', 'C', 'Dm', 'Dm', 'Bb', 'C', 'F', 'A7'),
+        melody=('Bb4', 'A4', 'G4', 'F4', 'G4', 'A4', 'Bb4', 'C5',
+                'D5', 'C5', 'Bb4', 'A4', 'G4', 'F4', 'G4', 'A4'),
+        bass=('Bb1', 'C2', 'D2', 'D2', 'Bb1', 'C2', 'F1', 'A1'),
+        velocity=None,
+        rhythm=(0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0)
+    )
+    
+    _CHORUS_BASE = SectionData(
+        chords=('Dm', 'Bb', 'F', 'C', 'Gm', 'Bb', 'F', 'A7') * 2,
+        melody=('D5', 'F5', 'G5', 'F5', 'D5', 'C5', 'D5', 'D5',
+                'Bb4', 'C5', 'D5', 'F5', 'G5', 'A5', 'F5', 'D5'),
+        bass=('D2', 'Bb1', 'F1', 'C2', 'G1', 'Bb1', 'F1', 'A1') * 2,
+        velocity=None,
+        rhythm=(1.0, 1.0, 0.5, 0.5, 1.0, 1.0, 1.0, 1.0)
+    )
+    
+    # Section contents, keyed by the names used in ``structure``
+    _SECTION_DATA = {
+        'intro': SectionData(
+            chords=('Dm', 'Bb', 'F', 'C') * 2,
+            melody=('D4', 'F4', 'G4', 'F4', 'D4', 'C4', 'D4', 'D4') * 2,
+            bass=('D2', 'Bb1', 'F1', 'C2') * 2,
+            velocity=60,
+            rhythm=(0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0)
+        ),
+        'verse1': _VERSE_BASE._replace(velocity=65),
+        'pre_chorus1': _PRE_CHORUS_BASE._replace(velocity=75),
+        'chorus1': _CHORUS_BASE._replace(velocity=100),
+        'verse2': _VERSE_BASE._replace(velocity=70),
+        'pre_chorus2': _PRE_CHORUS_BASE._replace(velocity=85),
+        'chorus2': _CHORUS_BASE._replace(velocity=110),
+        'bridge': SectionData(
+            chords=('Bb', 'F', 'C', 'Dm', 'Bb', 'F', 'A7', 'A7', 'Gm', 'Bb', 'C', 'Dm'),
+            melody=('F5', 'G5', 'A5', 'Bb5', 'A5', 'G5', 'F5', 'F5',
+                    'A5', 'G5', 'F5', 'D5', 'F5', 'G5', 'A5', 'Bb5'),
+            bass=('Bb1', 'F1', 'C2', 'D2', 'Bb1', 'F1', 'A1', 'A1', 'G1', 'Bb1', 'C2', 'D2'),
+            velocity=95,
+            rhythm=(0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0)
+        ),
+        'final_chorus': _CHORUS_BASE._replace(
+            chords=_CHORUS_BASE.chords[:8] * 3,
+            melody=_CHORUS_BASE.melody * 3,
+            bass=_CHORUS_BASE.bass[:8] * 3,
+            velocity=127
+        ),
+        'outro': SectionData(
+            chords=('Dm', 'Bb', 'F', 'C', 'Dm', 'Dm'),
+            melody=('D5', 'F5', 'G5', 'F5', 'D5', 'D5'),
+            bass=('D2', 'Bb1', 'F1', 'C2', 'D2', 'D2'),
+            velocity=60,
+            rhythm=(2.0, 2.0, 2.0, 2.0, 4.0, 4.0)
+        )
+    }
+
     def __init__(self):
         self.mid = MidiFile()
         self.tempo = 85  # BPM
@@ -16,22 +149,32 @@ class MidiConverter:
         self.key = 'Dm'  # D minor
         
         # Note mapping (MIDI note numbers)
-        self.notes = {
-            'C': 60, 'C#': 61, 'Db': 61, 'D': 62, 'D#': 63, 'Eb': 63,
-            'E': 64, 'F': 65, 'F#': 66, 'Gb': 66, 'G': 67, 'G#': 68,
-            'Ab': 68, 'A': 69, 'A#': 70, 'Bb': 70, 'B': 71
-        }
+        self.notes = NOTES
         
         # Chord definitions in D minor key
         self.chords = {
-            'Dm': [62, 65, 69],      # D, F, A
-            'Bb': [70, 62, 65],      # Bb, D, F  
-            'F': [65, 69, 60],       # F, A, C
-            'C': [60, 64, 67],       # C, E, G
-            'Gm': [67, 70, 62],      # G, Bb, D
-            'A7': [69, 61, 64, 67]   # A, C#, E, G
+            'Dm': (62, 65, 69),      # D, F, A
+            'Bb': (70, 62, 65),      # Bb, D, F  
+            'F': (65, 69, 60),       # F, A, C
+            'C': (60, 64, 67),       # C, E, G
+            'Gm': (67, 70, 62),      # G, Bb, D
+            'A7': (69, 61, 64, 67)   # A, C#, E, G
         }
         
+        # Tick lengths of the note values used by the song
+        self._ticks_cache = {beats: int(beats * self.ticks_per_beat)
+                             for beats in (0.25, 0.5, 1.0, 2.0, 4.0)}
+        
+        # Section rhythm patterns already converted to ticks
+        self._rhythm_ticks = {name: self._rhythm_to_ticks(data.rhythm)
+                              for name, data in self._SECTION_DATA.items()}
+        
+        # Prototype messages keyed by (type, channel, note, velocity)
+        self._protos = {}
+        
+        # Compiled section events keyed by (section_name, bars)
+        self._sections = {}
+        
         # Section structures
         self.structure = [
             ('intro', 8),
@@ -48,268 +191,252 @@ class MidiConverter:
         
     def beats_to_ticks(self, beats):
         """Convert beats to MIDI ticks"""
-        return int(beats * self.ticks_per_beat)
+        return self._ticks_cache.get(beats) or int(beats * self.ticks_per_beat)
+        
+    def _tempo_message(self):
+        """Return the tempo setting as a time-0 message"""
+        return mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(self.tempo))
         
     def add_tempo_change(self, track):
         """Add tempo setting to track"""
-        tempo_msg = mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(self.tempo))
-        track.append(tempo_msg)
+        track.append(self._tempo_message())
         
     def note_name_to_midi(self, note_name):
-        """Convert note name (e.g., 'D5') to MIDI number"""
-        if not note_name or note_name == 'rest':
-            return 60  # Default to middle C
-            
-        if len(note_name) < 2:
-            return self.notes.get(note_name, 60)
-        
-        try:
-            # Extract note and octave
-            if note_name[-1].isdigit():
-                note = note_name[:-1]
-                octave = int(note_name[-1])
-            else:
-                # No octave specified, default to 4
-                note = note_name
-                octave = 4
-                
-            base_note = self.notes.get(note, 60)
-            
-            # Adjust for octave (octave 4 = middle C area)
-            midi_note = base_note + (octave - 4) * 12
-            
-            # Clamp to valid MIDI range
-            midi_note = max(0, min(127, midi_note))
-            
-            return midi_note
-            
-        except (ValueError, IndexError) as e:
-            print(f"Warning: Could not parse note '{note_name}', using default. Error: {e}")
+        """Convert note name (e.g., 'D5') to MIDI number, defaulting to middle C"""
+        midi_note = NOTE_NAME_TO_MIDI.get(note_name)
+        if midi_note is None:
+            logger.debug("Could not parse note %r, using middle C", note_name)
             return 60
+        return midi_note
         
-    def add_chord_progression(self, track, chords, bars, velocity=80, time_offset=0):
-        """Add chord progression to track"""
+    def _chord_events(self, chords, bars, velocity=80, time_offset=0):
+        """Build (abs_tick, note, velocity, type) events for a chord progression"""
+        events = []
         beats_per_chord = 4  # Whole note chords
         
-        current_time = time_offset
+        hold = self._ticks_cache[beats_per_chord]
+        tick = time_offset
         
-        # Create the chord sequence for the specified number of bars
-        chord_sequence = (chords * (bars // len(chords) + 1))[:bars]
+        # Repeat the progression for the specified number of bars;
+        # unknown chords are held as rests
+        for chord in islice(cycle(chords), bars):
+            chord_notes = self.chords.get(chord, ())
+            events.extend((tick, note, velocity, 'note_on') for note in chord_notes)
+            events.extend((tick + hold, note, 0, 'note_off') for note in chord_notes)
+            tick += hold
+            
+        return events
         
-        for i, chord in enumerate(chord_sequence):
-            if chord in self.chords:
-                chord_notes = self.chords[chord]
-                
-                # Add chord notes
-                for note in chord_notes:
-                    track.append(Message('note_on', channel=0, note=note, 
-                                       velocity=velocity, time=current_time))
-                    current_time = 0  # Only first note gets the time offset
-                
-                # Hold for the duration
-                hold_time = self.beats_to_ticks(beats_per_chord)
-                
-                # Turn off chord notes
-                for note in chord_notes:
-                    track.append(Message('note_off', channel=0, note=note, 
-                                       velocity=0, time=hold_time))
-                    hold_time = 0  # Only first note gets the time offset
-                    
-                current_time = 0
-                
-    def add_melody(self, track, melody_notes, rhythm_pattern, velocity=90, time_offset=0):
-        """Add melody line to track"""
-        current_time = time_offset
+    def _rhythm_to_ticks(self, rhythm_pattern):
+        """Convert a rhythm pattern in beats to an array of tick durations"""
+        return array('i', [self.beats_to_ticks(beats) for beats in rhythm_pattern])
         
-        for i, note_name in enumerate(melody_notes):
-            if note_name == 'rest':
-                current_time += self.beats_to_ticks(rhythm_pattern[i % len(rhythm_pattern)])
-                continue
-                
-            midi_note = self.note_name_to_midi(note_name)
-            duration = self.beats_to_ticks(rhythm_pattern[i % len(rhythm_pattern)])
-            
-            # Note on
-            track.append(Message('note_on', channel=1, note=midi_note, 
-                               velocity=velocity, time=current_time))
-            
-            # Note off
-            track.append(Message('note_off', channel=1, note=midi_note, 
-                               velocity=0, time=duration))
+    def _melody_events(self, melody_notes, rhythm_ticks, velocity=90, time_offset=0):
+        """Build (abs_tick, note, velocity, type) events for a melody line"""
+        note_ids = [None if note_name == 'rest' else self.note_name_to_midi(note_name)
+                    for note_name in melody_notes]
+        return _emit_note_events(note_ids, cycle(rhythm_ticks), velocity, time_offset)
             
-            current_time = 0
-            
-    def add_bass_line(self, track, bass_notes, velocity=85, time_offset=0):
-        """Add bass line to track"""
-        current_time = time_offset
+    def _bass_events(self, bass_notes, velocity=85, time_offset=0):
+        """Build (abs_tick, note, velocity, type) events for a bass line"""
         beats_per_note = 4  # Whole notes
+        note_ids = [self.note_name_to_midi(note_name) for note_name in bass_notes]
+        durations = [self._ticks_cache[beats_per_note]] * len(note_ids)
+        return _emit_note_events(note_ids, durations, velocity, time_offset)
         
-        for note_name in bass_notes:
-            midi_note = self.note_name_to_midi(note_name)
-            duration = self.beats_to_ticks(beats_per_note)
-            
-            # Note on
-            track.append(Message('note_on', channel=2, note=midi_note, 
-                               velocity=velocity, time=current_time))
+    def _proto(self, msg_type, channel, note, velocity):
+        """Return a shared time-0 prototype message, creating it on first use"""
+        key = (msg_type, channel, note, velocity)
+        proto = self._protos.get(key)
+        if proto is None:
+            proto = self._protos[key] = Message(msg_type, channel=channel, note=note,
+                                                velocity=velocity, time=0)
+        return proto
+        
+    def _timed_messages(self, channel, events):
+        """Pair (abs_tick, note, velocity, type) events with prototype messages"""
+        return [(tick, self._proto(msg_type, channel, note, velocity))
+                for tick, note, velocity, msg_type in events]
+        
+    def _delta_encode(self, timed_messages):
+        """Turn (abs_tick, message) pairs into messages with delta times
+
+        Pairs are sorted (stably) by tick, so messages at the same tick keep
+        their order.
+        """
+        messages = []
+        previous = 0
+        for tick, msg in sorted(timed_messages, key=itemgetter(0)):
+            # Messages are already validated, so copies only need the new time
+            messages.append(msg.copy(skip_checks=True, time=tick - previous))
+            previous = tick
+        return messages
+        
+    def _append_events(self, track, channel, events):
+        """Append (abs_tick, note, velocity, type) events to track as messages
+
+        Ticks are relative to the end of the track's existing messages.
+        """
+        track.extend(self._delta_encode(self._timed_messages(channel, events)))
             
-            # Note off  
-            track.append(Message('note_off', channel=2, note=midi_note, 
-                               velocity=0, time=duration))
+    def add_chord_progression(self, track, chords, bars, velocity=80, time_offset=0):
+        """Add chord progression to track"""
+        self._append_events(track, 0, self._chord_events(chords, bars, velocity, time_offset))
+                
+    def add_melody(self, track, melody_notes, rhythm_pattern, velocity=90, time_offset=0,
+                   channel=1):
+        """Add melody line to track"""
+        rhythm_ticks = self._rhythm_to_ticks(rhythm_pattern)
+        self._append_events(track, channel, self._melody_events(melody_notes, rhythm_ticks,
+                                                                velocity, time_offset))
             
-            current_time = 0
+    def add_bass_line(self, track, bass_notes, velocity=85, time_offset=0):
+        """Add bass line to track"""
+        self._append_events(track, 2, self._bass_events(bass_notes, velocity, time_offset))
             
     def create_section(self, section_name, bars, start_time=0):
         """Create a specific section of the song"""
-        section_data = {
-            'intro': {
-                'chords': ['Dm', 'Bb', 'F', 'C'] * 2,
-                'melody': ['D4', 'F4', 'G4', 'F4', 'D4', 'C4', 'D4', 'D4'] * 2,
-                'bass': ['D2', 'Bb1', 'F1', 'C2'] * 2,
-                'velocity': 60,
-                'rhythm': [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
-            },
-            'verse1': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Dm', 'Bb', 'F', 'A7'] * 2,
-                'melody': ['D4', 'F4', 'G4', 'F4', 'D4', 'C4', 'D4', 'D4',
-                          'F4', 'G4', 'A4', 'G4', 'F4', 'D4', 'F4', 'F4'] * 1,
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'D2', 'Bb1', 'F1', 'A1'] * 2,
-                'velocity': 65,
-                'rhythm': [1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, 2.0]
-            },
-            'pre_chorus1': {
-                'chords': ['Bb', 'C', 'Dm', 'Dm', 'Bb', 'C', 'F', 'A7'],
-                'melody': ['Bb4', 'A4', 'G4', 'F4', 'G4', 'A4', 'Bb4', 'C5',
-                          'D5', 'C5', 'Bb4', 'A4', 'G4', 'F4', 'G4', 'A4'],
-                'bass': ['Bb1', 'C2', 'D2', 'D2', 'Bb1', 'C2', 'F1', 'A1'],
-                'velocity': 75,
-                'rhythm': [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
-            },
-            'chorus1': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Gm', 'Bb', 'F', 'A7'] * 2,
-                'melody': ['D5', 'F5', 'G5', 'F5', 'D5', 'C5', 'D5', 'D5',
-                          'Bb4', 'C5', 'D5', 'F5', 'G5', 'A5', 'F5', 'D5'] * 1,
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'G1', 'Bb1', 'F1', 'A1'] * 2,
-                'velocity': 100,
-                'rhythm': [1.0, 1.0, 0.5, 0.5, 1.0, 1.0, 1.0, 1.0]
-            },
-            'verse2': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Dm', 'Bb', 'F', 'A7'] * 2,
-                'melody': ['D4', 'F4', 'G4', 'F4', 'D4', 'C4', 'D4', 'D4',
-                          'F4', 'G4', 'A4', 'G4', 'F4', 'D4', 'F4', 'F4'] * 1,
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'D2', 'Bb1', 'F1', 'A1'] * 2,
-                'velocity': 70,
-                'rhythm': [1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, 2.0]
-            },
-            'pre_chorus2': {
-                'chords': ['Bb', 'C', 'Dm', 'Dm', 'Bb', 'C', 'F', 'A7'],
-                'melody': ['Bb4', 'A4', 'G4', 'F4', 'G4', 'A4', 'Bb4', 'C5',
-                          'D5', 'C5', 'Bb4', 'A4', 'G4', 'F4', 'G4', 'A4'],
-                'bass': ['Bb1', 'C2', 'D2', 'D2', 'Bb1', 'C2', 'F1', 'A1'],
-                'velocity': 85,
-                'rhythm': [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
-            },
-            'chorus2': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Gm', 'Bb', 'F', 'A7'] * 2,
-                'melody': ['D5', 'F5', 'G5', 'F5', 'D5', 'C5', 'D5', 'D5',
-                          'Bb4', 'C5', 'D5', 'F5', 'G5', 'A5', 'F5', 'D5'] * 1,
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'G1', 'Bb1', 'F1', 'A1'] * 2,
-                'velocity': 110,
-                'rhythm': [1.0, 1.0, 0.5, 0.5, 1.0, 1.0, 1.0, 1.0]
-            },
-            'bridge': {
-                'chords': ['Bb', 'F', 'C', 'Dm', 'Bb', 'F', 'A7', 'A7', 'Gm', 'Bb', 'C', 'Dm'],
-                'melody': ['F5', 'G5', 'A5', 'Bb5', 'A5', 'G5', 'F5', 'F5',
-                          'A5', 'G5', 'F5', 'D5', 'F5', 'G5', 'A5', 'Bb5'],
-                'bass': ['Bb1', 'F1', 'C2', 'D2', 'Bb1', 'F1', 'A1', 'A1', 'G1', 'Bb1', 'C2', 'D2'],
-                'velocity': 95,
-                'rhythm': [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
-            },
-            'final_chorus': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Gm', 'Bb', 'F', 'A7'] * 3,
-                'melody': ['D5', 'F5', 'G5', 'F5', 'D5', 'C5', 'D5', 'D5',
-                          'Bb4', 'C5', 'D5', 'F5', 'G5', 'A5', 'F5', 'D5'] * 3,
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'G1', 'Bb1', 'F1', 'A1'] * 3,
-                'velocity': 127,
-                'rhythm': [1.0, 1.0, 0.5, 0.5, 1.0, 1.0, 1.0, 1.0]
-            },
-            'outro': {
-                'chords': ['Dm', 'Bb', 'F', 'C', 'Dm', 'Dm'],
-                'melody': ['D5', 'F5', 'G5', 'F5', 'D5', 'D5'],
-                'bass': ['D2', 'Bb1', 'F1', 'C2', 'D2', 'D2'],
-                'velocity': 60,
-                'rhythm': [2.0, 2.0, 2.0, 2.0, 4.0, 4.0]
-            }
-        }
+        return self._SECTION_DATA.get(section_name, self._SECTION_DATA['intro'])
         
-        return section_data.get(section_name, section_data['intro'])
+    def _section_start_ticks(self):
+        """Return the absolute start tick of each section in ``structure``"""
+        bar_ticks = self._ticks_cache[4]  # 4/4 time
+        starts = []
+        tick = 0
+        for section_name, bars in self.structure:
+            starts.append(tick)
+            tick += bars * bar_ticks
+        return starts
         
-    def generate_midi(self, filename='alternative_rock_track.mid'):
-        """Generate the complete MIDI file"""
+    def _compile_section(self, section_name, bars):
+        """Build the chord, melody and bass events of a section once per converter
+
+        Event ticks are relative to the start of the section.
+        """
+        key = (section_name, bars)
+        if key in self._sections:
+            return self._sections[key]
+            
+        section_data = self.create_section(section_name, bars)
         
-        # Create tracks
-        chord_track = MidiTrack()
-        melody_track = MidiTrack()
-        bass_track = MidiTrack()
-        lead_track = MidiTrack()
+        chords = self._chord_events(
+            section_data.chords,
+            bars,
+            section_data.velocity
+        )
         
-        # Add tempo to first track
-        self.add_tempo_change(chord_track)
+        melody = self._melody_events(
+            section_data.melody,
+            self._rhythm_ticks.get(section_name, self._rhythm_ticks['intro']),
+            min(section_data.velocity + 10, 127)
+        )
         
-        # Set instruments
-        chord_track.append(Message('program_change', channel=0, program=25, time=0))  # Steel Guitar
-        melody_track.append(Message('program_change', channel=1, program=53, time=0))  # Voice
-        bass_track.append(Message('program_change', channel=2, program=33, time=0))   # Electric Bass
-        lead_track.append(Message('program_change', channel=3, program=29, time=0))   # Electric Guitar
+        bass = self._bass_events(
+            section_data.bass,
+            max(50, section_data.velocity - 15)
+        )
         
-        current_time = 0
+        compiled = self._sections[key] = (tuple(chords), tuple(melody), tuple(bass))
+        return compiled
         
-        # Generate each section
-        for section_name, bars in self.structure:
-            section_data = self.create_section(section_name, bars)
+    def _write_midi_fast(self, path):
+        """Write self.mid as a Standard MIDI File in one pass over the messages"""
+        if self.mid.type == 0 and len(self.mid.tracks) != 1:
+            raise ValueError('type 0 file must have exactly 1 track')
             
-            # Add section to tracks
-            self.add_chord_progression(
-                chord_track, 
-                section_data['chords'], 
-                bars, 
-                section_data['velocity'],
-                current_time if section_name == 'intro' else 0
-            )
+        data = bytearray(b'MThd')
+        data.extend(struct.pack('>Lhhh', 6, self.mid.type, len(self.mid.tracks),
+                                self.mid.ticks_per_beat))
+        
+        for track in self.mid.tracks:
+            chunk = bytearray()
+            running_status = None
             
-            self.add_melody(
-                melody_track,
-                section_data['melody'],
-                section_data['rhythm'],
-                min(section_data['velocity'] + 10, 127),
-                current_time if section_name == 'intro' else 0
-            )
+            # Like MidiFile.save, move end_of_track to the end of the track
+            for msg in fix_end_of_track(track):
+                chunk.extend(_encode_vlq(msg.time))
+                
+                if msg.is_meta:
+                    running_status = None
+                    chunk.extend(msg.bytes())
+                    continue
+                    
+                if msg.type == 'sysex':
+                    # Files store sysex as F0 <length> data F7, length including F7
+                    running_status = None
+                    chunk.append(0xF0)
+                    chunk.extend(_encode_vlq(len(msg.data) + 1))
+                    chunk.extend(msg.data)
+                    chunk.append(0xF7)
+                    continue
+                    
+                msg_bytes = msg.bytes()
+                
+                # Omit repeated channel status bytes (running status)
+                status = msg_bytes[0]
+                chunk.extend(msg_bytes[1:] if status == running_status else msg_bytes)
+                running_status = status if status < 0xF0 else None
+                
+            data.extend(b'MTrk')
+            data.extend(struct.pack('>L', len(chunk)))
+            data.extend(chunk)
             
-            self.add_bass_line(
-                bass_track,
-                section_data['bass'],
-                max(50, section_data['velocity'] - 15),
-                current_time if section_name == 'intro' else 0
-            )
+        with open(path, 'wb') as outfile:
+            outfile.write(data)
             
-            current_time = 0  # Reset for subsequent sections
+    def _part_messages(self, channel, program, part):
+        """Return (abs_tick, message) pairs for one part (0 chords, 1 melody, 2 bass)"""
+        timed = [(0, Message('program_change', channel=channel, program=program, time=0))]
+        
+        # Place each section at its absolute start
+        for (section_name, bars), start in zip(self.structure, self._section_start_ticks()):
+            timed.extend((start + tick, self._proto(msg_type, channel, note, velocity))
+                         for tick, note, velocity, msg_type
+                         in self._compile_section(section_name, bars)[part])
             
+        return timed
+        
+    def _chord_messages(self):
+        """Return the rhythm guitar chords, preceded by the song tempo"""
+        return [(0, self._tempo_message())] + self._part_messages(0, 25, 0)  # Steel Guitar
+        
+    def _melody_messages(self):
+        """Return the vocal melody"""
+        return self._part_messages(1, 53, 1)  # Voice
+        
+    def _bass_messages(self):
+        """Return the bass guitar line"""
+        return self._part_messages(2, 33, 2)  # Electric Bass
+        
+    def _lead_messages(self):
+        """Return the lead guitar hook"""
+        timed = [(0, Message('program_change', channel=3, program=29, time=0))]  # Electric Guitar
+        
         # Add lead guitar hook for choruses
         lead_hook = ['A5', 'F5', 'D5', 'F5', 'G5', 'A5', 'Bb5', 'A5',
                     'F5', 'D5', 'C5', 'D5', 'F5', 'G5', 'F5', 'D5']
         lead_rhythm = [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
         
-        # Add lead to chorus sections (approximate timing)
-        chorus_start_time = self.beats_to_ticks(32)  # After intro + verse + pre-chorus
-        self.add_melody(lead_track, lead_hook, lead_rhythm, 100, chorus_start_time)
+        # Add lead at the start of the first chorus
+        section_names = [section_name for section_name, bars in self.structure]
+        chorus_start_time = self._section_start_ticks()[section_names.index('chorus1')]
+        timed.extend(self._timed_messages(3, self._melody_events(
+            lead_hook, self._rhythm_to_ticks(lead_rhythm), 100, chorus_start_time)))
+        return timed
+        
+    def generate_midi(self, filename='alternative_rock_track.mid'):
+        """Generate the complete MIDI file"""
+        
+        # Collect every part at absolute ticks; parts keep their own channels
+        timed = (self._chord_messages() + self._melody_messages() +
+                 self._bass_messages() + self._lead_messages())
         
-        # Add tracks to MIDI file
-        self.mid.tracks.append(chord_track)
-        self.mid.tracks.append(melody_track) 
-        self.mid.tracks.append(bass_track)
-        self.mid.tracks.append(lead_track)
+        # Delta-encode once into a single-track (format 0) MIDI file
+        self.mid.type = 0
+        self.mid.tracks = [MidiTrack(self._delta_encode(timed))]
         
         # Save file
-        self.mid.save(filename)
+        self._write_midi_fast(filename)
         print(f"MIDI file saved as: {filename}")
         
         return filename